@@ -1,11 +1,11 @@
 import json
 import operator
 import re
-from typing import Annotated, Literal, Sequence, TypedDict
+from typing import Annotated, Sequence, TypedDict
 
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langchain_ollama import ChatOllama
-from langgraph.graph import END, START, StateGraph
+from langgraph.graph import END, StateGraph
 from langgraph.prebuilt import ToolNode
 
 from tools import get_part_id, get_shipping_cost, get_stock_level, get_supplier_location
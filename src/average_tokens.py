@@ -1,7 +1,53 @@
-import json
 import os
+from statistics import fmean, StatisticsError
 
-DATA_FILE = '../test/answers_code_granite.json'   
+from serialization import loads, JSONDecodeError
+
+try:
+    import ijson  # Optional: streams the answers array instead of loading it whole
+except ImportError:
+    ijson = None
+
+DATA_FILE = '../test/answers_code_granite.json'
+
+DECODE_ERRORS = (JSONDecodeError, ijson.JSONError) if ijson else (JSONDecodeError,)
+
+def entry_tokens(items):
+    """Yields 'total_tokens' from each entry that has one"""
+    for item in items:
+        if isinstance(item, dict) and 'total_tokens' in item:
+            yield item['total_tokens']
+
+def iter_total_tokens(f, filepath: str):
+    """Iterator over each entry's 'total_tokens' from a JSON array or a JSONL log.
+
+    Returns None (after reporting it) when a JSON file's top level is not an array.
+    """
+    if filepath.endswith(".jsonl"):
+        return entry_tokens(loads(line) for line in f if line.strip())
+
+    if ijson is not None:
+        # The first parse event is enough to tell an array from anything else
+        _, event, _ = next(ijson.parse(f))
+        f.seek(0)
+        if event != 'start_array':
+            print(f"Error: Expected a JSON list/array, but the top-level value starts with '{event}'.")
+            return None
+        return ijson.items(f, 'item.total_tokens')
+
+    data = loads(f.read())
+    if not isinstance(data, list):
+        print(f"Error: Expected a JSON list/array, but found type {type(data)}.")
+        return None
+    return entry_tokens(data)
+
+def as_floats(values):
+    """Coerces token counts to float, skipping (and reporting) non-numeric entries"""
+    for value in values:
+        try:
+            yield float(value)
+        except (TypeError, ValueError):
+            print(f"'total_tokens' value '{value}' is not a valid number. Skipping this entry.")
 
 def calculate_average_tokens(filepath: str) -> float:
     if not os.path.exists(filepath):
@@ -9,41 +55,26 @@ def calculate_average_tokens(filepath: str) -> float:
         return 0.0
 
     try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-    except json.JSONDecodeError:
+        with open(filepath, 'rb') as f:
+            values = iter_total_tokens(f, filepath)
+            if values is None:
+                return 0.0
+            # One pass; fmean sums with math.fsum in C
+            return fmean(as_floats(values))
+    except StatisticsError:
+        print("No valid 'total_tokens' entries found to calculate an average.")
+        return 0.0
+    except DECODE_ERRORS:
         print(f"Error: Failed to decode JSON from '{filepath}'. Ensure the file is valid JSON.")
         return 0.0
     except Exception as e:
         print(f"An unexpected error occurred while reading the file: {e}")
         return 0.0
 
-    if not isinstance(data, list):
-        print(f"Error: Expected a JSON list/array, but found type {type(data)}.")
-        return 0.0
-        
-    total_sum = 0.0
-    count = 0
-    
-    for item in data:
-        if isinstance(item, dict) and 'total_tokens' in item:
-            try:
-                total_sum += float(item['total_tokens'])
-                count += 1
-            except ValueError:
-                print(f"'total_tokens' value '{item['total_tokens']}' is not a valid number. Skipping this entry.")
-                
-    if count == 0:
-        print("No valid 'total_tokens' entries found to calculate an average.")
-        return 0.0
-    
-    average = total_sum / count
-    return average
-
-if __name__ == "__main__":   
+if __name__ == "__main__":
     avg = calculate_average_tokens(DATA_FILE)
-    
+
     if avg > 0.0:
         print(f"\n--- Analysis Results ---")
         print(f"The average of total_tokens is: {avg:.2f}")
-        print(f"------------------------\n")
\ No newline at end of file
+        print(f"------------------------\n")
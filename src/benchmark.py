@@ -1,43 +1,109 @@
-import json
+import functools
+import hashlib
 import logging
 import time
 import requests
 
 from agent_graph import run_hierarchical_agent
+from serialization import loads
 
 logging.basicConfig(level=logging.ERROR) 
 
 MODEL_NAME = "granite4:tiny-h"
 OLLAMA_TOKENIZE_URL = "http://localhost:11434/api/tokenize"
 
+# Count tokens in-process with the model's HuggingFace tokenizer (needs the optional
+# `transformers` package). Set to False to always use Ollama's tokenize endpoint.
+USE_LOCAL_TOKENIZER = True
+HF_TOKENIZER_NAME = "ibm-granite/granite-4.0-h-tiny"  # Same tokenizer as MODEL_NAME
+
+# Keep-alive session so repeated tokenize calls reuse one TCP connection
+session = requests.Session()
+TOKENIZE_TIMEOUT = 10  # Seconds per tokenize request
+
+# Circuit breaker: after this many failed tokenize requests, estimate for the rest of the run
+MAX_TOKENIZE_FAILURES = 3
+_fail_count = 0
+_use_fallback = False
+
+# Token counts keyed on a content hash, so large texts are not kept alive as keys
+TOKEN_CACHE_SIZE = 8192
+_token_cache = {}
+
+@functools.lru_cache(maxsize=1)
+def _get_tokenizer():
+    """Loads the fast (Rust) tokenizer once; None falls back to the HTTP endpoint"""
+    if not USE_LOCAL_TOKENIZER:
+        return None
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(HF_TOKENIZER_NAME, use_fast=True)
+    except Exception as e:
+        logging.warning(f"Local tokenizer unavailable ({e}), using Ollama tokenize endpoint")
+        return None
+
+def _count_text_tokens(text: str) -> int:
+    """Tokenizes text locally or via Ollama; failures raise and are therefore not cached"""
+    key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+    cached = _token_cache.pop(key, None)
+    if cached is not None:
+        _token_cache[key] = cached  # Re-insert to mark as most recently used
+        return cached
+
+    tokenizer = _get_tokenizer()
+    if tokenizer is not None:
+        count = len(tokenizer.encode(text, add_special_tokens=False))
+    else:
+        response = session.post(
+            OLLAMA_TOKENIZE_URL,
+            json={"model": MODEL_NAME, "prompt": text},
+            timeout=TOKENIZE_TIMEOUT
+        )
+        response.raise_for_status()
+        count = len(response.json().get("tokens", []))
+
+    if len(_token_cache) >= TOKEN_CACHE_SIZE:
+        _token_cache.pop(next(iter(_token_cache)))  # Evict the least recently used entry
+    _token_cache[key] = count
+    return count
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer-free estimate of roughly 4 characters per token"""
+    return max(1, len(text) // 4) if text else 0
+
 def count_tokens(input_data) -> int:
     """Counts token usage using the same tokenizer as the model"""
-    text_content = ""
-    
-    if isinstance(input_data, str):
-        text_content = input_data
-    elif isinstance(input_data, list):
+    if isinstance(input_data, list):
+        # Sum per-message counts instead of tokenizing one concatenated string, so each
+        # message (e.g. a system prompt repeated across calls) is cached on its own.
+        # BPE counts are near-additive across messages; off by a few tokens at most.
+        total = 0
         for m in input_data:
             if hasattr(m, 'content'): 
-                text_content += str(m.content) + " "
+                total += count_tokens(str(m.content))
             elif isinstance(m, dict):
-                text_content += str(m.get('content', '')) + " "
+                total += count_tokens(str(m.get('content', '')))
             else:
-                text_content += str(m) + " "
+                total += count_tokens(str(m))
+        return total
 
-    try:
-        response = requests.post(
-            OLLAMA_TOKENIZE_URL,
-            json={"model": MODEL_NAME, "prompt": text_content}
-        )
-        response.raise_for_status()
-        return len(response.json().get("tokens", []))
-    except Exception as e:
-        return int(len(text_content.split()) * 1.5)
+    global _fail_count, _use_fallback
+    text_content = input_data if isinstance(input_data, str) else ""
 
+    if _use_fallback:
+        return estimate_tokens(text_content)
+
+    try:
+        return _count_text_tokens(text_content)
+    except requests.RequestException as e:
+        _fail_count += 1
+        if _fail_count > MAX_TOKENIZE_FAILURES:
+            logging.warning(f"Tokenize failed {_fail_count} times ({e}); estimating tokens for the rest of the run")
+            _use_fallback = True
+        return estimate_tokens(text_content)
 
 if __name__ == "__main__":
-    with open('../test/test_set.json', 'r') as f: TEST_SET = json.load(f)
+    with open('../test/test_set.json', 'rb') as f: TEST_SET = loads(f.read())
 
     print(f"Benchmark on {len(TEST_SET)} questions...")
     print("-" * 100)
@@ -48,12 +114,12 @@ if __name__ == "__main__":
 
     for case in TEST_SET:
         query = case["q"]
-        start = time.time()
+        start = time.perf_counter()
         
         ans = ""
         try:
             ans, _ = run_hierarchical_agent(query)
-            duration = time.time() - start
+            duration = time.perf_counter() - start
             
             total_time += duration
             
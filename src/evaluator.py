@@ -0,0 +1,398 @@
+import argparse
+import asyncio
+import functools
+import itertools
+import logging
+import os
+import random
+import re
+import sys
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import httpx
+from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from ollama import ResponseError
+
+from mcp_client import MODEL_NAME, build_agent, mcp_session_pool, run_async
+from response_cache import ResponseCache, cache_key
+from serialization import loads, dumps, dumps_line, dumps_sorted, write_atomic, JSONDecodeError
+
+# Cases in flight against Ollama at once. A local server mostly works through them one at a time,
+# so above 1 the per-case times (and the timeout budget) include queueing behind other cases
+MAX_CONCURRENCY = 1
+POOL_SIZE = 1  # MCP server subprocesses; agents are safe to share across cases
+MAX_RETRIES = 2  # Extra attempts per case after a transient error (timeouts are not retried)
+RETRY_BASE_DELAY = 1.0  # Seconds before the first retry, doubled each attempt
+RETRY_MAX_DELAY = 10.0
+
+def is_transient(error):
+    """Connection-level failures and Ollama server errors; anything else would fail again"""
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return True
+    return isinstance(error, ResponseError) and error.status_code >= 500
+
+# Matched case-insensitively against the raw output, avoiding a lowered copy of it
+REFUSAL_PATTERN = re.compile(r"cannot|sorry|scope|unable", re.IGNORECASE)
+
+# Progress goes through one handler so concurrent cases emit whole lines in a single write
+logger = logging.getLogger("Eval")
+
+CODE_SYSTEM_PROMPT = """You are an expert SCM Python Engineer.
+Instead of calling tools one by one, you MUST write a Python script to solve the user's problem.
+
+You have access to a tool called `execute_python_code`.
+Inside this tool, the following functions are ALREADY available (do not import them):
+- get_part_id(name) -> str
+- get_stock_level(id) -> str
+- get_supplier_location(id) -> str
+- get_shipping_cost(city) -> str
+
+STRATEGY:
+1. Write a SINGLE script that chains these calls together.
+2. Use variables to store results (e.g., `pid = get_part_id("Engine")`).
+3. Use `print()` to output the final answer.
+"""
+
+# REVISED SYSTEM PROMPT
+STANDARD_SYSTEM_PROMPT = """You are an expert SCM Assistant. 
+You have access to specific tools to find Part IDs, check stock, and calculate shipping.
+
+CRITICAL RULES:
+1. You MUST use the provided tools to get real data. DO NOT guess or hallucinate IDs.
+2. Always search for the **Part ID** first using `find_part_id`.
+3. To find shipping, you must first find the supplier city for that ID, then calculate shipping for that city.
+4. Do not describe what you are doing. Just execute the tool calls.
+"""
+
+@functools.lru_cache(maxsize=1)
+def load_test_cases():
+    """Parsed once per process; callers must not mutate the returned cases"""
+    with open('../test/test_set.json', 'rb') as f: return loads(f.read())
+
+@functools.lru_cache(maxsize=None)
+def expected_check(expected):
+    """Compiled keyword pattern and refusal flag for an expected answer, built once"""
+    return re.compile(re.escape(expected), re.IGNORECASE), "refusal" in expected.casefold()
+
+def validate_keyword(final_out, case):
+    """PASS if the expected keyword appears in the answer"""
+    expected_pat, _ = expected_check(case["expected"])
+    return "PASS" if expected_pat.search(final_out) else "FAIL"
+
+def validate_keyword_or_refusal(final_out, case):
+    """Like validate_keyword, but out-of-scope questions also pass on a refusal"""
+    expected_pat, is_refusal = expected_check(case["expected"])
+    if expected_pat.search(final_out):
+        return "PASS"
+    if is_refusal and REFUSAL_PATTERN.search(final_out):
+        return "PASS (Refusal)"
+    return "FAIL"
+
+@dataclass(frozen=True)
+class EvalConfig:
+    """Everything that differs between evaluating one agent mode and another"""
+    mode: str  # "standard" (step-by-step tools) or "code" (execute_python_code)
+    system_prompt: str
+    answers_file: str  # Indented snapshot, written once at the end
+    answers_log: str  # Per-case append-only log
+    validate: Callable[[str, dict], str]
+    model_name: str = MODEL_NAME
+    timeout: Optional[float] = None  # Seconds per case; None waits indefinitely
+
+CODE_CONFIG = EvalConfig(
+    mode="code",
+    system_prompt=CODE_SYSTEM_PROMPT,
+    answers_file="../test/answers_code_qwen.json",
+    answers_log="../test/answers_code_qwen.jsonl",
+    validate=validate_keyword_or_refusal,
+    timeout=300.0
+)
+
+STANDARD_CONFIG = EvalConfig(
+    mode="standard",
+    system_prompt=STANDARD_SYSTEM_PROMPT,
+    answers_file="../test/answers_mcp_qwen.json",
+    answers_log="../test/answers_mcp_qwen.jsonl",
+    validate=validate_keyword
+)
+
+CONFIGS = {"standard": STANDARD_CONFIG, "code": CODE_CONFIG}
+
+class AnswerLog:
+    """Append-only JSONL answers log, written as each case finishes (in completion order)"""
+
+    def __init__(self, log_file, logs):
+        self.log_file = log_file
+        self.logs = logs
+
+    def log_debug(self, case, actual, status, duration, input_tokens, output_tokens, total_tokens, cached=False):
+        entry = {
+            "id": case['id'],
+            "q": case['q'],
+            "exp": case['expected'],
+            "act": actual,
+            "status": status,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": total_tokens,
+            "duration_seconds": round(duration, 2),
+            "cached": cached
+        }
+
+        self.logs.append(entry)
+        self.log_file.write(dumps_line(entry))
+
+def build_snapshot(logs):
+    """Orders entries by id (the latest entry wins for a repeated id) and fills in the running totals.
+
+    Answers replayed from the response cache took no model time, so they stay out of the totals.
+    """
+    latest = {entry['id']: entry for entry in logs}
+    cum_time, cum_tokens = 0.0, 0
+    snapshot = []
+    for _, entry in sorted(latest.items()):
+        cached = entry.get("cached", False)
+        if not cached:
+            cum_time += entry["duration_seconds"]
+            cum_tokens += entry["total_tokens"]
+        snapshot.append({
+            "id": entry["id"],
+            "q": entry["q"],
+            "exp": entry["exp"],
+            "act": entry["act"],
+            "status": entry["status"],
+            "input_tokens": entry["input_tokens"],
+            "output_tokens": entry["output_tokens"],
+            "total_tokens": entry["total_tokens"],
+            "cumulative_total_tokens": cum_tokens,
+            "duration_seconds": entry["duration_seconds"],
+            "cumulative_time_seconds": round(cum_time, 2),
+            "cached": cached
+        })
+    return snapshot
+
+def calculate_tokens(messages):
+    """Helper to sum tokens from a list of messages."""
+    metas = [m.usage_metadata for m in messages if isinstance(m, AIMessage) and m.usage_metadata]
+    return (
+        sum(meta.get("input_tokens", 0) for meta in metas),
+        sum(meta.get("output_tokens", 0) for meta in metas),
+        sum(meta.get("total_tokens", 0) for meta in metas)
+    )
+
+def load_logs(answers_log, answers_file, start_id):
+    """Reads the existing answers, keeping only entries before start_id.
+
+    The JSONL log is preferred; without one (e.g. a fresh checkout) the indented snapshot is used.
+    """
+    logs = []
+    if os.path.exists(answers_log):
+        with open(answers_log, 'rb') as f:
+            for line in f:
+                try:
+                    logs.append(loads(line))
+                except JSONDecodeError:
+                    # A half-written trailing line from an interrupted run
+                    logger.warning("Skipping unparseable line in existing answers log.")
+        logger.info(f"Loaded {len(logs)} existing answers from {answers_log}")
+    elif os.path.exists(answers_file):
+        with open(answers_file, 'rb') as f:
+            logs = loads(f.read())
+        logger.info(f"Loaded {len(logs)} existing answers from {answers_file}")
+    else:
+        return logs
+
+    # Entries are appended in completion order, so the log is not sorted by id
+    original_count = len(logs)
+    logs = [l for l in logs if l['id'] < start_id]
+
+    if len(logs) < original_count:
+        logger.info(f"Truncated logs to {len(logs)} entries (keeping IDs < {start_id})")
+    return logs
+
+async def run_evaluation(config, sessions, cache, start_id=1, max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES):
+    """Evaluates one mode over the test set using agents built on the given MCP sessions"""
+    cases = load_test_cases()
+
+    # --- 1. Load and Filter Existing Logs ---
+    logs = load_logs(config.answers_log, config.answers_file, start_id)
+
+    # Rewrite the kept prefix once, then only append
+    write_atomic(config.answers_log, b"".join(dumps_line(entry) for entry in logs))
+
+    # --- 2. Filter Cases to Run ---
+    cases_to_run = [c for c in cases if c['id'] >= start_id]
+
+    if not cases_to_run:
+        logger.info("No questions left to evaluate based on start ID.")
+        return
+
+    logger.info(f"Evaluating {len(cases_to_run)} cases in {config.mode.upper()} MODE ({config.model_name})...")
+
+    # Longest first (question + expected length as a proxy), so slow cases don't straggle at the end;
+    # the snapshot is re-sorted by id
+    cases_to_run.sort(key=lambda c: -(len(c["q"]) + len(c["expected"])))
+
+    # Build every case's answer check before the fan-out
+    for c in cases_to_run: expected_check(c["expected"])
+
+    # Messages are immutable, so every case shares one system message
+    system_msg = SystemMessage(content=config.system_prompt)
+
+    agents = [build_agent(session, tools, config.mode, config.model_name, max_concurrency) for session, tools in sessions]
+    agent_cycle = itertools.cycle(agents)  # Round-robin; agents are re-entrant
+    sem = asyncio.Semaphore(max_concurrency)
+
+    # Part of the cache key, so editing a tool or its description invalidates earlier answers
+    tool_schema = dumps_sorted([[t.name, t.description, t.inputSchema] for t in sessions[0][1]])
+
+    # --- 3. Run Cases Concurrently ---
+    async def evaluate_case(case):
+        # Exact-match cache hit: reuse the earlier answer without calling the model
+        key = cache_key(config.model_name, config.system_prompt, tool_schema, case["q"])
+        cached = cache.get(key)
+        if cached is not None:
+            final_out, i_tok, o_tok, t_tok = cached
+            status = config.validate(final_out, case)
+            logger.info(f"   -> Q{case['id']} {status} (Cached | Tokens: {t_tok})")
+            return (case, final_out, status, 0.0, i_tok, o_tok, t_tok, True)
+
+        async with sem:
+            agent = next(agent_cycle)
+            logger.info(f"\nRunning Q{case['id']}: {case['q']}")
+            start = time.perf_counter()
+
+            messages = [system_msg, HumanMessage(content=case["q"])]
+
+            # Helper to stream and capture history for timeout recovery
+            current_history = []
+
+            async def consume_stream():
+                nonlocal current_history, start
+                for attempt in range(max_retries + 1):
+                    current_history = []
+                    start = time.perf_counter()  # Only the successful attempt is timed
+                    try:
+                        async for chunk in agent.astream({"messages": messages}, stream_mode="values"):
+                            current_history = chunk["messages"]
+                        return current_history
+                    except Exception as e:
+                        if attempt == max_retries or not is_transient(e):
+                            raise
+                        # Exponential backoff with jitter so retries don't hit Ollama in lockstep
+                        delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, 1))
+                        logger.info(f"   -> Q{case['id']} retry {attempt + 1}/{max_retries} in {delay:.1f}s: {e}")
+                        await asyncio.sleep(delay)
+
+            try:
+                history = await asyncio.wait_for(consume_stream(), timeout=config.timeout)
+                duration = time.perf_counter() - start
+
+                # Sum usage from all AI messages (intermediate tool calls + final answer)
+                i_tok, o_tok, t_tok = calculate_tokens(history)
+
+                if t_tok == 0:
+                    logger.warning("Warning: usage_metadata missing. Counts may be 0.")
+
+                # Content is usually already a str; only list content (multi-part messages) needs converting
+                content = history[-1].content
+                final_out = content if isinstance(content, str) else str(content)
+
+                status = config.validate(final_out, case)
+                if status.startswith("PASS"):
+                    cache.put(key, (final_out, i_tok, o_tok, t_tok))
+
+                logger.info(f"   -> Q{case['id']} {status} (Time: {duration:.2f}s | Tokens: {t_tok})")
+                return (case, final_out, status, duration, i_tok, o_tok, t_tok)
+
+            except Exception as e:
+                # Without a case timeout, a TimeoutError can only come from inside the agent
+                if isinstance(e, asyncio.TimeoutError) and config.timeout is not None:
+                    # Timeout path token calculation (using partial history)
+                    i_tok, o_tok, t_tok = calculate_tokens(current_history)
+
+                    logger.info(f"   -> Q{case['id']} CRASH: Timeout (>{config.timeout:g}s) | Partial Tokens: {t_tok}")
+                    return (case, f"Timeout: Execution exceeded {config.timeout:g} seconds", "CRASH", config.timeout, i_tok, o_tok, t_tok)
+
+                # General crash (usually 0 tokens unless we want to track partial here too, but riskier)
+                logger.info(f"   -> Q{case['id']} CRASH: {e}")
+                return (case, str(e), "CRASH", 0, 0, 0, 0)
+
+    # --- 4. Log Each Case As It Finishes ---
+    # Unbuffered, so an interrupted run keeps every finished case for resuming
+    with open(config.answers_log, 'ab', buffering=0) as log_file:
+        answer_log = AnswerLog(log_file, logs)
+
+        async def run_case(case):
+            try:
+                entry = await evaluate_case(case)
+            except Exception as e:
+                entry = (case, str(e), "CRASH", 0, 0, 0, 0)
+            answer_log.log_debug(*entry)
+
+        run_start = time.perf_counter()
+        await asyncio.gather(*(run_case(c) for c in cases_to_run))
+        wall_time = time.perf_counter() - run_start
+
+    # Question order and cumulative fields only exist in the snapshot
+    snapshot = build_snapshot(logs)
+    write_atomic(config.answers_file, dumps(snapshot))
+
+    passed = len([l for l in snapshot if "PASS" in l["status"]])
+    replayed = len([l for l in snapshot if l["cached"]])
+    logger.info("\n" + "="*50 + "\n" + f"{config.mode.title()} Mode Evaluation Complete. Score: {passed}/{len(snapshot)}"
+                + (f" ({replayed} replayed from cache)" if replayed else ""))
+    logger.info(f"Wall-clock time: {wall_time:.2f}s for {len(cases_to_run)} cases (max concurrency {max_concurrency})")
+    logger.info(f"Detailed logs saved to {config.answers_file}")
+
+async def evaluate(configs, start_id=1, max_concurrency=MAX_CONCURRENCY, use_cache=False, pool_size=POOL_SIZE, max_retries=MAX_RETRIES):
+    """Runs each config back to back, sharing the MCP servers and the answer cache"""
+    async with AsyncExitStack() as stack:
+        sessions = await stack.enter_async_context(mcp_session_pool(size=pool_size))
+        cache = stack.enter_context(ResponseCache(enabled=use_cache))
+
+        for config in configs:
+            await run_evaluation(config, sessions, cache, start_id, max_concurrency, max_retries)
+
+def _int_at_least(minimum):
+    """argparse type for an int flag with a lower bound, so bad values fail before any server starts"""
+    def parse(value):
+        n = int(value)
+        if n < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}, got {n}")
+        return n
+    return parse
+
+def main(modes=None):
+    """CLI entry point; `modes` fixes which modes run, otherwise --mode selects them"""
+    parser = argparse.ArgumentParser(description="Evaluate the MCP agent on the test set.")
+    parser.add_argument("start_id", nargs="?", type=int, default=1, help="Question ID to resume from")
+    if modes is None:
+        parser.add_argument("--mode", choices=["standard", "code", "both"], default="both", help="Agent mode(s) to evaluate")
+    parser.add_argument("--max-concurrency", type=_int_at_least(1), default=MAX_CONCURRENCY, help="Cases in flight at once (above 1, per-case times include queueing)")
+    parser.add_argument("--cache", action="store_true", help="Replay earlier passing answers instead of calling the model")
+    parser.add_argument("--max-retries", type=_int_at_least(0), default=MAX_RETRIES, help="Retries per case after a transient error")
+    parser.add_argument("--pool-size", type=_int_at_least(1), default=POOL_SIZE, help="MCP server subprocesses to spread cases over")
+    args = parser.parse_args()
+
+    # Configure only this logger: a root logger at INFO would also print httpx's per-request lines
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    if modes is None:
+        modes = ["standard", "code"] if args.mode == "both" else [args.mode]
+    if args.start_id > 1:
+        logger.info(f"Resuming evaluation from Question ID: {args.start_id}")
+
+    configs = [CONFIGS[mode] for mode in modes]
+    run_async(evaluate(configs, args.start_id, args.max_concurrency, use_cache=args.cache, pool_size=args.pool_size, max_retries=args.max_retries))
+    sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import os
+import sys
+
+from serialization import loads, dumps, write_atomic
+
+def jsonl_to_json(src: str, dst: str = None) -> str:
+    """Converts an append-only JSONL answers log into the indented JSON array form"""
+    if dst is None:
+        dst = os.path.splitext(src)[0] + ".json"
+
+    with open(src, 'rb') as f:
+        logs = [loads(line) for line in f if line.strip()]
+
+    write_atomic(dst, dumps(logs))
+    return dst
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python jsonl_to_json.py <answers.jsonl> [answers.json]")
+        sys.exit(1)
+
+    out = jsonl_to_json(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"Wrote {out}")
@@ -1,53 +1,89 @@
 import asyncio
+import functools
 import sys
 import os
-from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Annotated, TypedDict, Type, Any
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncGenerator, Annotated, TypedDict, Type
 
+import httpx
 from pydantic import BaseModel, Field, create_model
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.messages import BaseMessage, HumanMessage
 from langchain_core.tools import StructuredTool
 from langchain_ollama import ChatOllama
 
-from langgraph.graph import StateGraph, START, END
+from langgraph.graph import StateGraph, START
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
 
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
+from serialization import loads, dumps_sorted
+
 MODEL_NAME = "qwen2.5:14B"
 SERVER_SCRIPT = "mcp_server.py"
+MAX_CONNECTIONS = 1  # Pooled keep-alive connections to Ollama; match the evaluators' concurrency
+
+JSON_TYPE_MAP = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+    "array": list,
+    "object": dict
+}
+
+# FieldInfo objects shared between identical fields, keyed on (py_type, is_required, description)
+_FIELD_CACHE = {}
+
+def _field(py_type: type, is_required: bool, description: str):
+    key = (py_type, is_required, description)
+    field = _FIELD_CACHE.get(key)
+    if field is None:
+        default = ... if is_required else None
+        field = _FIELD_CACHE[key] = Field(default=default, description=description)
+    return field
 
 def jsonschema_to_pydantic(name: str, schema: dict) -> Type[BaseModel]:
     fields = {}
     properties = schema.get("properties", {})
     required = schema.get("required", [])
 
-    type_map = {
-        "string": str,
-        "integer": int,
-        "number": float,
-        "boolean": bool,
-        "array": list,
-        "object": dict
-    }
-
     for field_name, detail in properties.items():
         json_type = detail.get("type", "string")
-        py_type = type_map.get(json_type, str)
+        py_type = JSON_TYPE_MAP.get(json_type, str)
         is_required = field_name in required
-        default = ... if is_required else None
         description = detail.get("description", "")
-        fields[field_name] = (py_type, Field(default=default, description=description))
+        fields[field_name] = (py_type, _field(py_type, is_required, description))
 
     return create_model(name, **fields)
 
+@functools.lru_cache(maxsize=256)
+def _cached_schema_model(name: str, schema_json: bytes) -> Type[BaseModel]:
+    """Builds each (name, schema) model once; schema_json must be canonical (dumps_sorted)"""
+    return jsonschema_to_pydantic(name, loads(schema_json))
+
+@functools.lru_cache(maxsize=4)
+def _get_llm(model: str, max_connections: int = MAX_CONNECTIONS) -> ChatOllama:
+    # One HTTP client per model, so every concurrent case reuses its kept-alive connections
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections, keepalive_expiry=60)
+    return ChatOllama(model=model, temperature=0, num_ctx=4096, client_kwargs={"limits": limits})
+
+# bind_tools output keyed on (model, connections, tool names); it holds only the tool schemas, not the session
+_BOUND_LLMS = {}
+
+def _bind_cached(model: str, max_connections: int, tools: list):
+    key = (model, max_connections, tuple(t.name for t in tools))
+    if key not in _BOUND_LLMS:
+        _BOUND_LLMS[key] = _get_llm(model, max_connections).bind_tools(tools)
+    return _BOUND_LLMS[key]
+
 class AgentState(TypedDict):
     messages: Annotated[list[BaseMessage], add_messages]
 
 @asynccontextmanager
-async def mcp_server_context(mode: str = "standard") -> AsyncGenerator:
+async def mcp_session_context() -> AsyncGenerator:
+    """Starts the MCP server subprocess once and yields (session, tools) for building agents"""
     if not os.path.exists(SERVER_SCRIPT):
         raise FileNotFoundError(f"Server script not found: {SERVER_SCRIPT}")
 
@@ -60,7 +96,7 @@ async def mcp_server_context(mode: str = "standard") -> AsyncGenerator:
         env=env
     )
 
-    print(f"Connecting to MCP Server ({SERVER_SCRIPT}) in {mode.upper()} mode...")
+    print(f"Connecting to MCP Server ({SERVER_SCRIPT})...")
     
     try:
         async with stdio_client(server_params) as (read, write):
@@ -68,58 +104,97 @@ async def mcp_server_context(mode: str = "standard") -> AsyncGenerator:
                 await session.initialize()
                 
                 mcp_tools = await session.list_tools()
-                langchain_tools = []
-
-                for tool in mcp_tools.tools:
-                    if mode == "standard" and tool.name == "execute_python_code":
-                        continue
-                        
-                    def create_tool_wrapper(tool_name):
-                        async def wrapper(**kwargs):
-                            return await session.call_tool(tool_name, arguments=kwargs)
-                        return wrapper
-
-                    args_schema = jsonschema_to_pydantic(f"{tool.name}Schema", tool.inputSchema)
-
-                    langchain_tools.append(StructuredTool.from_function(
-                        func=None,
-                        coroutine=create_tool_wrapper(tool.name),
-                        name=tool.name,
-                        description=tool.description,
-                        args_schema=args_schema
-                    ))
-                
-                print(f"Loaded {len(langchain_tools)} tools.")
+                yield session, mcp_tools.tools
 
-                llm = ChatOllama(model=MODEL_NAME, temperature=0, num_ctx=4096)
-                llm_with_tools = llm.bind_tools(langchain_tools)
+    except Exception as e:
+        print(f"\nError: {e}")
+        raise
 
-                def agent_node(state: AgentState):
-                    return {"messages": [llm_with_tools.invoke(state["messages"])]}
+def build_agent(session: ClientSession, tools: list, mode: str = "standard", model: str = MODEL_NAME,
+                max_connections: int = MAX_CONNECTIONS):
+    """Compiles the agent graph for a mode on top of an already open MCP session"""
+    langchain_tools = []
+
+    # Wrappers close over this session, so they are built per session
+    def create_tool_wrapper(tool_name):
+        async def wrapper(**kwargs):
+            return await session.call_tool(tool_name, arguments=kwargs)
+        return wrapper
+
+    for tool in tools:
+        if mode == "standard" and tool.name == "execute_python_code":
+            continue
+
+        args_schema = _cached_schema_model(
+            f"{tool.name}Schema", dumps_sorted(tool.inputSchema)
+        )
+
+        langchain_tools.append(StructuredTool.from_function(
+            func=None,
+            coroutine=create_tool_wrapper(tool.name),
+            name=tool.name,
+            description=tool.description,
+            args_schema=args_schema
+        ))
+    
+    print(f"Loaded {len(langchain_tools)} tools in {mode.upper()} mode.")
 
-                workflow = StateGraph(AgentState)
-                workflow.add_node("agent", agent_node)
-                workflow.add_node("tools", ToolNode(langchain_tools))
-                
-                workflow.add_edge(START, "agent")
-                workflow.add_conditional_edges("agent", tools_condition)
-                workflow.add_edge("tools", "agent")
+    llm_with_tools = _bind_cached(model, max_connections, langchain_tools)
 
-                agent = workflow.compile()
-                yield agent
+    # Async node: the model call runs on the event loop instead of a worker thread, and
+    # ToolNode's async path gathers multiple tool calls from one turn concurrently
+    # (ClientSession routes the interleaved responses by request id)
+    async def agent_node(state: AgentState):
+        return {"messages": [await llm_with_tools.ainvoke(state["messages"])]}
 
-    except Exception as e:
-        print(f"\nError: {e}")
-        raise
+    workflow = StateGraph(AgentState)
+    workflow.add_node("agent", agent_node)
+    workflow.add_node("tools", ToolNode(langchain_tools))
+    
+    workflow.add_edge(START, "agent")
+    workflow.add_conditional_edges("agent", tools_condition)
+    workflow.add_edge("tools", "agent")
+
+    return workflow.compile()
+
+@asynccontextmanager
+async def mcp_session_pool(size: int = 1) -> AsyncGenerator:
+    """Yields a list of `size` (session, tools) pairs, each with its own MCP server subprocess.
+
+    A compiled agent is re-entrant (no checkpointer, stateless nodes, and ClientSession
+    routes concurrent requests by id), so a single agent can serve concurrent cases, and
+    agents for different modes can be built on the same session. Extra servers only help
+    when tool execution is the bottleneck, because each server runs its synchronous tools
+    one at a time.
+    """
+    async with AsyncExitStack() as stack:
+        yield [await stack.enter_async_context(mcp_session_context()) for _ in range(size)]
+
+def run_async(main):
+    """asyncio.run, on uvloop's event loop when it is installed (uvloop.run needs uvloop >= 0.18)"""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(main)
+    if not hasattr(uvloop, "run"):
+        return asyncio.run(main)
+    return uvloop.run(main)
 
 async def run_interactive(mode="standard"):
     """Interactive test mode without a system prompt"""   
-    async with mcp_server_context(mode=mode) as agent:
-        print(f"{mode.title()} Mode Ready. Type 'quit' to exit.")
+    async with mcp_session_context() as (session, tools):
+        agent = build_agent(session, tools, mode)
+        print(f"{mode.title()} Mode Ready. Type 'switch' to change mode, 'quit' to exit.")
         
         while True:
             user_input = input(f"\n({mode}) User: ")
             if user_input.lower() in ["quit", "exit"]: break
+
+            if user_input.lower() == "switch":
+                # Rebuild the agent on the running server instead of restarting it
+                mode = "standard" if mode == "code" else "code"
+                agent = build_agent(session, tools, mode)
+                continue
             
             messages = [
                 HumanMessage(content=user_input)
@@ -149,6 +224,6 @@ if __name__ == "__main__":
         choice = input("Choice (1/2): ").strip()
         
         mode = "code" if choice == "2" else "standard"
-        asyncio.run(run_interactive(mode))
+        run_async(run_interactive(mode))
     except KeyboardInterrupt:
         pass
\ No newline at end of file
@@ -1,8 +1,8 @@
 import sys
 import os
-import logging
-import io
 import contextlib
+import functools
+import logging
 import traceback
 
 sys.stdout.reconfigure(line_buffering=True)
@@ -20,8 +20,44 @@ except ImportError as e:
     logger.error(f"Failed to import tools: {e}")
     sys.exit(1)
 
+def _cached_lookup(fn):
+    """Memoizes a deterministic lookup on the str() of its arguments.
+
+    Scripts may pass unhashable values (e.g. a list of IDs); the tools str() their input anyway,
+    so those get the tool's usual error string instead of a TypeError from the cache.
+    """
+    cached = functools.lru_cache(maxsize=256)(fn)
+
+    @functools.wraps(fn)
+    def lookup(*args, **kwargs):
+        return cached(*map(str, args), **{k: str(v) for k, v in kwargs.items()})
+    return lookup
+
+# The lookups are deterministic, so repeated calls (within a script or across cases) are served from memory
+get_part_id = _cached_lookup(get_part_id)
+get_stock_level = _cached_lookup(get_stock_level)
+get_supplier_location = _cached_lookup(get_supplier_location)
+get_shipping_cost = _cached_lookup(get_shipping_cost)
+
 mcp = FastMCP("SCM_Logistics_Server")
 
+class _OutputBuffer(list):
+    """File-like list that collects everything a sandboxed script writes to stdout"""
+    def write(self, s):
+        self.append(s)
+        return len(s)
+
+    def flush(self):
+        pass
+
+def _make_print(buffer: _OutputBuffer):
+    """print() replacement for sandboxed scripts; stdout output goes straight into buffer"""
+    def _print(*args, sep=" ", end="\n", file=None, flush=False):
+        if file is not None and file is not sys.stdout:
+            return print(*args, sep=sep, end=end, file=file, flush=flush)
+        buffer.append((" " if sep is None else sep).join(map(str, args)) + ("\n" if end is None else end))
+    return _print
+
 @mcp.tool()
 def find_part_id(part_name: str) -> str:
     """
@@ -95,16 +131,19 @@ def execute_python_code(code: str) -> str:
         "find_supplier_city": get_supplier_location,
         "get_shipping_cost": get_shipping_cost,
         "calculate_shipping": get_shipping_cost,
-        "print": print
     }
-    
-    output_capture = io.StringIO()
+
+    # print() appends to the buffer directly; stdout stays redirected into it for
+    # sys.stdout.write and print(file=sys.stdout)
+    output = _OutputBuffer()
+    sandbox_globals["print"] = _make_print(output)
     
     try:
-        with contextlib.redirect_stdout(output_capture):
-            exec(code, sandbox_globals)
+        code_obj = compile(code, "<sandbox>", "exec")
+        with contextlib.redirect_stdout(output):
+            exec(code_obj, sandbox_globals)
         
-        result = output_capture.getvalue()
+        result = "".join(output)
         if not result.strip():
             return "Code executed successfully but printed no output. Did you forget print()?"
         return result
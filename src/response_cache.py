@@ -0,0 +1,38 @@
+"""Exact-match (L0) cache of passing agent answers, persisted across evaluation runs.
+
+Opt-in (--cache): replayed answers take no time, and shelve has no cross-process locking,
+so only one evaluator process should use the cache at a time.
+"""
+import hashlib
+import shelve
+
+CACHE_PATH = "../test/.llm_cache"
+
+def cache_key(model: str, system_prompt: str, tool_schema: bytes, question: str) -> str:
+    """tool_schema is the canonical JSON of the tools' names, descriptions and input schemas"""
+    h = hashlib.blake2b(f"{model}|{system_prompt}|{question}|".encode())
+    h.update(tool_schema)
+    return h.hexdigest()
+
+class ResponseCache:
+    """shelve-backed store of key -> (final_out, input_tokens, output_tokens, total_tokens)"""
+
+    def __init__(self, path: str = CACHE_PATH, enabled: bool = False):
+        self._db = shelve.open(path) if enabled else None
+
+    def get(self, key: str):
+        return self._db.get(key) if self._db is not None else None
+
+    def put(self, key: str, value: tuple):
+        if self._db is not None:
+            self._db[key] = value
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
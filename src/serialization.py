@@ -0,0 +1,52 @@
+"""JSON helpers backed by orjson when it is installed, stdlib json otherwise.
+
+All dumps functions return bytes, so files must be opened in binary mode.
+"""
+import json
+import os
+
+JSONDecodeError = json.JSONDecodeError
+
+try:
+    import orjson
+
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj) -> bytes:
+        """Indented JSON, used for the answers snapshots"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    def dumps_line(obj) -> bytes:
+        """Compact JSON terminated by a newline, used for JSONL logs"""
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+
+    def dumps_sorted(obj) -> bytes:
+        """Compact JSON with sorted keys, a canonical form usable as a cache key"""
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+
+except ImportError:
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(obj) -> bytes:
+        """Indented JSON, used for the answers snapshots"""
+        return json.dumps(obj, indent=2).encode()
+
+    def dumps_line(obj) -> bytes:
+        """Compact JSON terminated by a newline, used for JSONL logs"""
+        return (json.dumps(obj) + "\n").encode()
+
+    def dumps_sorted(obj) -> bytes:
+        """Compact JSON with sorted keys, a canonical form usable as a cache key"""
+        return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()
+
+
+def write_atomic(path: str, data: bytes):
+    """Writes data to a temp file and renames it over path, so readers never see a partial file"""
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
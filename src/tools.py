@@ -1,6 +1,5 @@
 import difflib
 import logging
-import re
 
 # Setup Logger
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(message)s')